@@ -22,11 +22,7 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 #
 
-import hashlib
 from optparse import OptionParser
-import os
-import random
-import re
 import sys
 from pySim.ts_51_011 import EF, DF, EF_SST_map, EF_AD_mode_map
 from pySim.ts_31_102 import EF_UST_map, EF_USIM_ADF_map
@@ -36,36 +32,13 @@ from pySim.commands import SimCardCommands
 from pySim.cards import card_detect, Card
 from pySim.utils import h2b, swap_nibbles, rpad, dec_imsi, dec_iccid, dec_msisdn
 from pySim.utils import format_xplmn_w_act, dec_spn, dec_st, init_reader, dec_addr_tlv
-from pySim.utils import h2s, format_ePDGSelection
+from pySim.utils import h2s, format_ePDGSelection, add_reader_options
 
 def parse_options():
 
 	parser = OptionParser(usage="usage: %prog [options]")
 
-	parser.add_option("-d", "--device", dest="device", metavar="DEV",
-			help="Serial Device for SIM access [default: %default]",
-			default="/dev/ttyUSB0",
-		)
-	parser.add_option("-b", "--baud", dest="baudrate", type="int", metavar="BAUD",
-			help="Baudrate used for SIM access [default: %default]",
-			default=9600,
-		)
-	parser.add_option("-p", "--pcsc-device", dest="pcsc_dev", type='int', metavar="PCSC",
-			help="Which PC/SC reader number for SIM access",
-			default=None,
-		)
-	parser.add_option("--modem-device", dest="modem_dev", metavar="DEV",
-			help="Serial port of modem for Generic SIM Access (3GPP TS 27.007)",
-			default=None,
-		)
-	parser.add_option("--modem-baud", dest="modem_baud", type="int", metavar="BAUD",
-			help="Baudrate used for modem's port [default: %default]",
-			default=115200,
-		)
-	parser.add_option("--osmocon", dest="osmocon_sock", metavar="PATH",
-			help="Socket path for Calypso (e.g. Motorola C1XX) based reader (via OsmocomBB)",
-			default=None,
-		)
+	add_reader_options(parser)
 
 	(options, args) = parser.parse_args()
 
@@ -236,8 +209,9 @@ if __name__ == '__main__':
 	(res, sw) = card.read_binary('AD')
 	if sw == '9000':
 		print("Administrative data: %s" % (res,))
-		if res[:2] in EF_AD_mode_map:
-			print("\tMS operation mode: %s" % (EF_AD_mode_map[res[:2]],))
+		op_mode = EF_AD_mode_map.get(res[:2])
+		if op_mode is not None:
+			print("\tMS operation mode: %s" % (op_mode,))
 		else:
 			print("\tMS operation mode: (unknown 0x%s)" % (res[:2],))
 		if int(res[4:6], 16) & 0x01:
@@ -351,10 +325,8 @@ if __name__ == '__main__':
 		except Exception as e:
 			print("UICC IARI: Can't read file -- " + str(e))
 
-	# Check whether we have th AID of ISIM, if so select it by its AID
-	# EF.IST - File Id in ADF ISIM : 6f07
-	if '9000' == card.select_adf_by_aid(adf="isim"):
-		# EF.IST
+		# EF.IST - File Id in ADF ISIM : 6f07
+		# ADF.ISIM is still selected, no need to select it again
 		(res, sw) = card.read_binary('6f07')
 		if sw == '9000':
 			print("ISIM Service Table: %s" % res)
@@ -27,15 +27,22 @@ from pySim.ts_51_011 import EF, DF
 from pySim.ts_31_102 import EF_USIM_ADF_map
 from pySim.ts_31_103 import EF_ISIM_ADF_map
 from pySim.utils import *
-from smartcard.util import toBytes
 from pytlv.TLV import *
 
+# First (known) halves of the U/ISIM AID
+_aid_prefix_map = {
+	'usim': 'a0000000871002',
+	'isim': 'a0000000871004',
+}
+
 class Card(object):
 
 	def __init__(self, scc):
 		self._scc = scc
 		self._adm_chv_num = 4
 		self._aids = []
+		# AIDs indexed by their RID + application code (first 7 bytes)
+		self._aids_by_app = {}
 
 	def reset(self):
 		self._scc.reset_card()
@@ -185,11 +192,11 @@ class Card(object):
 		return sw
 
 	def read_binary(self, ef, length=None, offset=0):
-		ef_path = ef in EF and EF[ef] or ef
+		ef_path = EF.get(ef, ef)
 		return self._scc.read_binary(ef_path, length, offset)
 
 	def read_record(self, ef, rec_no):
-		ef_path = ef in EF and EF[ef] or ef
+		ef_path = EF.get(ef, ef)
 		return self._scc.read_record(ef_path, rec_no)
 
 	def read_gid1(self):
@@ -209,34 +216,32 @@ class Card(object):
 	# Fetch all the AIDs present on UICC
 	def read_aids(self):
 		try:
-			# Find out how many records the EF.DIR has
-			# and store all the AIDs in the UICC
-			rec_cnt = self._scc.record_count(EF['DIR'])
-			for i in range(0, rec_cnt):
-				rec = self._scc.read_record(EF['DIR'], i + 1)
-				if (rec[0][0:2], rec[0][4:6]) == ('61', '4f') and len(rec[0]) > 12 \
-				and rec[0][8:8 + int(rec[0][6:8], 16) * 2] not in self._aids:
-					self._aids.append(rec[0][8:8 + int(rec[0][6:8], 16) * 2])
+			# Read all records of EF.DIR and store all the AIDs
+			# in the UICC
+			for rec in self._scc.read_records(EF['DIR']):
+				# Some readers (e.g. AT+CSIM modems) respond in upper case,
+				# normalize so that AIDs match the prefixes in _aid_prefix_map
+				data = rec[0].lower()
+				if (data[0:2], data[4:6]) != ('61', '4f') or len(data) <= 12:
+					continue
+				aid = data[8:8 + int(data[6:8], 16) * 2]
+				if aid not in self._aids:
+					self._aids.append(aid)
+					self._aids_by_app.setdefault(aid[:14], aid)
 		except Exception as e:
 			print("Can't read AIDs from SIM -- %s" % (str(e),))
 
 	# Select ADF.U/ISIM in the Card using its full AID
 	def select_adf_by_aid(self, adf="usim"):
 		# Check for valid ADF name
-		if adf not in ["usim", "isim"]:
+		if adf not in _aid_prefix_map:
 			return None
 
-		# First (known) halves of the U/ISIM AID
-		aid_map = {}
-		aid_map["usim"] = "a0000000871002"
-		aid_map["isim"] = "a0000000871004"
-
-		for aid in self._aids:
-			if aid_map[adf] in aid:
-				(res, sw) = self._scc.select_adf(aid)
-				return sw
-
-		return None
+		aid = self._aids_by_app.get(_aid_prefix_map[adf])
+		if aid is None:
+			return None
+		(res, sw) = self._scc.select_adf(aid)
+		return sw
 
 	# Erase the contents of a file
 	def erase_binary(self, ef):
@@ -260,8 +265,6 @@ class UsimCard(Card):
 			return (None, sw)
 
 	def update_ehplmn(self, mcc, mnc):
-		data = self._scc.read_binary(EF_USIM_ADF_map['EHPLMN'], length=None, offset=0)
-		size = len(data[0]) // 2
 		ehplmn = enc_plmn(mcc, mnc)
 		data, sw = self._scc.update_binary(EF_USIM_ADF_map['EHPLMN'], ehplmn)
 		return sw
@@ -277,7 +280,7 @@ class UsimCard(Card):
 		size = self._scc.binary_size(EF_USIM_ADF_map['ePDGId']) * 2
 		if len(epdgid) > 0:
 			addr_type = get_addr_type(epdgid)
-			if addr_type == None:
+			if addr_type is None:
 				raise ValueError("Unknown ePDG Id address type or invalid address provided")
 			epdgid_tlv = rpad(enc_addr_tlv(epdgid, ('%02x' % addr_type)), size)
 		else:
@@ -323,10 +326,8 @@ class IsimCard(Card):
 		super(IsimCard, self).__init__(ssc)
 
 	def read_pcscf(self):
-		rec_cnt = self._scc.record_count(EF_ISIM_ADF_map['PCSCF'])
 		pcscf_recs = ""
-		for i in range(0, rec_cnt):
-			(res, sw) = self._scc.read_record(EF_ISIM_ADF_map['PCSCF'], i + 1)
+		for (res, sw) in self._scc.read_records(EF_ISIM_ADF_map['PCSCF']):
 			if sw == '9000':
 				content = dec_addr_tlv(res)
 				pcscf_recs += "%s" % (len(content) and content or '\tNot available\n')
@@ -337,7 +338,7 @@ class IsimCard(Card):
 	def update_pcscf(self, pcscf):
 		if len(pcscf) > 0:
 			addr_type = get_addr_type(pcscf)
-			if addr_type == None:
+			if addr_type is None:
 				raise ValueError("Unknown PCSCF address type or invalid address provided")
 			content = enc_addr_tlv(pcscf, ('%02x' % addr_type))
 		else:
@@ -398,10 +399,8 @@ class IsimCard(Card):
 		return sw
 
 	def read_impu(self):
-		rec_cnt = self._scc.record_count(EF_ISIM_ADF_map['IMPU'])
 		impu_recs = ""
-		for i in range(0, rec_cnt):
-			(res, sw) = self._scc.read_record(EF_ISIM_ADF_map['IMPU'], i + 1)
+		for (res, sw) in self._scc.read_records(EF_ISIM_ADF_map['IMPU']):
 			if sw == '9000':
 				# Skip the inital tag value ('80') byte and get length of contents
 				length = int(res[2:4], 16)
@@ -425,10 +424,8 @@ class IsimCard(Card):
 		return sw
 
 	def read_iari(self):
-		rec_cnt = self._scc.record_count(EF_ISIM_ADF_map['UICCIARI'])
 		uiari_recs = ""
-		for i in range(0, rec_cnt):
-			(res, sw) = self._scc.read_record(EF_ISIM_ADF_map['UICCIARI'], i + 1)
+		for (res, sw) in self._scc.read_records(EF_ISIM_ADF_map['UICCIARI']):
 			if sw == '9000':
 				# Skip the inital tag value ('80') byte and get length of contents
 				length = int(res[2:4], 16)
@@ -721,7 +718,7 @@ class SysmoSIMgr1(GrcardSim):
 	def autodetect(kls, scc):
 		try:
 			# Look for ATR
-			if scc.get_atr() == toBytes("3B 99 18 00 11 88 22 33 44 55 66 77 60"):
+			if scc.get_atr() == h2i("3b991800118822334455667760"):
 				return kls(scc)
 		except:
 			return None
@@ -764,7 +761,7 @@ class SysmoSIMgr2(Card):
 	def autodetect(kls, scc):
 		try:
 			# Look for ATR
-			if scc.get_atr() == toBytes("3B 7D 94 00 00 55 55 53 0A 74 86 93 0B 24 7C 4D 54 68"):
+			if scc.get_atr() == h2i("3b7d9400005555530a7486930b247c4d5468"):
 				return kls(scc)
 		except:
 			return None
@@ -844,7 +841,7 @@ class SysmoUSIMSJS1(UsimCard):
 	def autodetect(kls, scc):
 		try:
 			# Look for ATR
-			if scc.get_atr() == toBytes("3B 9F 96 80 1F C7 80 31 A0 73 BE 21 13 67 43 20 07 18 00 00 01 A5"):
+			if scc.get_atr() == h2i("3b9f96801fc78031a073be21136743200718000001a5"):
 				return kls(scc)
 		except:
 			return None
@@ -965,7 +962,7 @@ class FairwavesSIM(UsimCard):
 	def autodetect(kls, scc):
 		try:
 			# Look for ATR
-			if scc.get_atr() == toBytes("3B 9F 96 80 1F C7 80 31 A0 73 BE 21 13 67 44 22 06 10 00 00 01 A9"):
+			if scc.get_atr() == h2i("3b9f96801fc78031a073be21136744220610000001a9"):
 				return kls(scc)
 		except:
 			return None
@@ -1089,7 +1086,7 @@ class OpenCellsSim(Card):
 	def autodetect(kls, scc):
 		try:
 			# Look for ATR
-			if scc.get_atr() == toBytes("3B 9F 95 80 1F C3 80 31 E0 73 FE 21 13 57 86 81 02 86 98 44 18 A8"):
+			if scc.get_atr() == h2i("3b9f95801fc38031e073fe21135786810286984418a8"):
 				return kls(scc)
 		except:
 			return None
@@ -1139,7 +1136,7 @@ class WavemobileSim(UsimCard):
 	def autodetect(kls, scc):
 		try:
 			# Look for ATR
-			if scc.get_atr() == toBytes("3B 9F 95 80 1F C7 80 31 E0 73 F6 21 13 67 4D 45 16 00 43 01 00 8F"):
+			if scc.get_atr() == h2i("3b9f95801fc78031e073f62113674d4516004301008f"):
 				return kls(scc)
 		except:
 			return None
@@ -1228,18 +1225,18 @@ class SysmoISIMSJA2(UsimCard, IsimCard):
 	def autodetect(kls, scc):
 		try:
 			# Try card model #1
-			atr = "3B 9F 96 80 1F 87 80 31 E0 73 FE 21 1B 67 4A 4C 75 30 34 05 4B A9"
-			if scc.get_atr() == toBytes(atr):
+			atr = "3b9f96801f878031e073fe211b674a4c753034054ba9"
+			if scc.get_atr() == h2i(atr):
 				return kls(scc)
 
 			# Try card model #2
-			atr = "3B 9F 96 80 1F 87 80 31 E0 73 FE 21 1B 67 4A 4C 75 31 33 02 51 B2"
-			if scc.get_atr() == toBytes(atr):
+			atr = "3b9f96801f878031e073fe211b674a4c7531330251b2"
+			if scc.get_atr() == h2i(atr):
 				return kls(scc)
 
 			# Try card model #3
-			atr = "3B 9F 96 80 1F 87 80 31 E0 73 FE 21 1B 67 4A 4C 52 75 31 04 51 D5"
-			if scc.get_atr() == toBytes(atr):
+			atr = "3b9f96801f878031e073fe211b674a4c5275310451d5"
+			if scc.get_atr() == h2i(atr):
 				return kls(scc)
 		except:
 			return None
@@ -1441,6 +1438,9 @@ _cards_classes = [ FakeMagicSim, SuperSim, MagicSim, GrcardSim,
 		   SysmoSIMgr1, SysmoSIMgr2, SysmoUSIMgr1, SysmoUSIMSJS1,
 		   FairwavesSIM, OpenCellsSim, WavemobileSim, SysmoISIMSJA2 ]
 
+# Card classes indexed by their name (see card_detect)
+_cards_classes_by_name = dict([(kls.name, kls) for kls in _cards_classes])
+
 def card_autodetect(scc):
 	for kls in _cards_classes:
 		card = kls.autodetect(scc)
@@ -1452,7 +1452,6 @@ def card_autodetect(scc):
 def card_detect(ctype, scc):
 	# Detect type if needed
 	card = None
-	ctypes = dict([(kls.name, kls) for kls in _cards_classes])
 
 	if ctype in ("auto", "auto_once"):
 		for kls in _cards_classes:
@@ -1469,8 +1468,8 @@ def card_detect(ctype, scc):
 		if ctype == "auto_once":
 			ctype = card.name
 
-	elif ctype in ctypes:
-		card = ctypes[ctype](scc)
+	elif ctype in _cards_classes_by_name:
+		card = _cards_classes_by_name[ctype](scc)
 
 	else:
 		raise ValueError("Unknown card type: %s" % ctype)
@@ -25,19 +25,34 @@
 from pySim.utils import rpad, b2h
 
 class SimCardCommands(object):
+
+	# TLV parser for FCP templates, shared by all instances (see __parse_fcp)
+	_fcp_tlvparser = None
+
 	def __init__(self, transport):
 		self._tp = transport
 		self._cla_byte = "a0"
 		self.sel_ctrl = "0000"
+		self._last_fcp = None
+		self._last_fcp_parsed = None
 
 	# Extract a single FCP item from TLV
 	def __parse_fcp(self, fcp):
 		# see also: ETSI TS 102 221, chapter 11.1.1.3.1 Response for MF,
 		# DF or ADF
-		from pytlv.TLV import TLV
-		tlvparser = TLV(['82', '83', '84', 'a5', '8a', '8b', '8c', '80', 'ab', 'c6', '81', '88'])
+
+		# record_count() looks at the same select response twice (record
+		# length and file size), so keep the result of the last parse.
+		if fcp == self._last_fcp:
+			return self._last_fcp_parsed
+
+		if SimCardCommands._fcp_tlvparser is None:
+			from pytlv.TLV import TLV
+			SimCardCommands._fcp_tlvparser = TLV(['82', '83', '84', 'a5', '8a', '8b', '8c', '80', 'ab', 'c6', '81', '88'])
+		tlvparser = SimCardCommands._fcp_tlvparser
 
 		# pytlv is case sensitive!
+		fcp_raw = fcp
 		fcp = fcp.lower()
 
 		if fcp[0:2] != '62':
@@ -58,7 +73,9 @@ class SimCardCommands(object):
 
 		# Skip FCP tag and length
 		tlv = fcp[skip:]
-		return tlvparser.parse(tlv)
+		self._last_fcp_parsed = tlvparser.parse(tlv)
+		self._last_fcp = fcp_raw
+		return self._last_fcp_parsed
 
 	# Tell the length of a record by the card response
 	# USIMs respond with an FCP template, which is different
@@ -155,11 +172,23 @@ class SimCardCommands(object):
 		if res[0].lower() != data.lower():
 			raise ValueError('Binary verification failed (expected %s, got %s)' % (data.lower(), res[0].lower()))
 
+	def __read_record(self, rec_no, rec_length):
+		pdu = self.cla_byte + 'b2%02x04%02x' % (rec_no, rec_length)
+		return self._tp.send_apdu(pdu)
+
 	def read_record(self, ef, rec_no):
 		r = self.select_file(ef)
 		rec_length = self.__record_len(r)
-		pdu = self.cla_byte + 'b2%02x04%02x' % (rec_no, rec_length)
-		return self._tp.send_apdu(pdu)
+		return self.__read_record(rec_no, rec_length)
+
+	# Read all records of a linear fixed EF. The EF is selected only once
+	# instead of once per record, which saves the SELECT round trips when
+	# dumping record based files.
+	def read_records(self, ef):
+		r = self.select_file(ef)
+		rec_length = self.__record_len(r)
+		rec_cnt = self.__len(r) // rec_length
+		return [self.__read_record(rec_no, rec_length) for rec_no in range(1, rec_cnt + 1)]
 
 	def update_record(self, ef, rec_no, data, force_len=False, verify=False):
 		r = self.select_file(ef)
@@ -91,15 +91,20 @@ class LinkBase(object):
 			    sw   : string (in hex) of status word (ex. "9000")
 		"""
 		rv = self.send_apdu(pdu)
+		sw = sw.lower()
+		rsp_sw = rv[1].lower()
 
 		# Create a masked version of the returned status word
-		sw_masked = ""
-		for i in range(0, 4):
-			if sw.lower()[i] == '?':
-				sw_masked = sw_masked + '?'
-			else:
-				sw_masked = sw_masked + rv[1][i].lower()
-
-		if sw.lower() != sw_masked:
-			raise RuntimeError("SW match failed! Expected %s and got %s." % (sw.lower(), rv[1]))
+		if '?' in sw:
+			sw_masked = ""
+			for i in range(0, 4):
+				if sw[i] == '?':
+					sw_masked = sw_masked + '?'
+				else:
+					sw_masked = sw_masked + rsp_sw[i]
+		else:
+			sw_masked = rsp_sw
+
+		if sw != sw_masked:
+			raise RuntimeError("SW match failed! Expected %s and got %s." % (sw, rv[1]))
 		return rv
@@ -32,6 +32,12 @@ from pySim.transport import LinkBase
 from pySim.exceptions import *
 from pySim.utils import h2b, b2h
 
+# Precompiled formats of the L1CTL framing, used for every APDU
+_l1ctl_len = struct.Struct("!H")
+_l1ctl_hdr = struct.Struct("BBxx")
+_l1ctl_reset_req = struct.Struct("Bxxx")
+_l1ctl_reset_conf = struct.Struct("!HB")
+
 class L1CTLMessage(object):
 
 	# Every (encoded) L1CTL message has the following structure:
@@ -44,10 +50,10 @@ class L1CTLMessage(object):
 
 	def __init__(self, msg_type, flags = 0x00):
 		# Init L1CTL message header
-		self.data = struct.pack("BBxx", msg_type, flags)
+		self.data = _l1ctl_hdr.pack(msg_type, flags)
 
 	def gen_msg(self):
-		return struct.pack("!H", len(self.data)) + self.data
+		return _l1ctl_len.pack(len(self.data)) + self.data
 
 class L1CTLMessageReset(L1CTLMessage):
 
@@ -63,7 +69,7 @@ class L1CTLMessageReset(L1CTLMessage):
 
 	def __init__(self, type = L1CTL_RES_T_FULL):
 		super(L1CTLMessageReset, self).__init__(self.L1CTL_RESET_REQ)
-		self.data += struct.pack("Bxxx", type)
+		self.data += _l1ctl_reset_req.pack(type)
 
 class L1CTLMessageSIM(L1CTLMessage):
 
@@ -108,7 +114,7 @@ class CalypsoSimLink(LinkBase):
 
 		# Wait for confirmation
 		rsp = self.wait_for_rsp()
-		rsp_msg = struct.unpack_from("!HB", rsp)
+		rsp_msg = _l1ctl_reset_conf.unpack_from(rsp)
 		if rsp_msg[1] != L1CTLMessageReset.L1CTL_RESET_CONF:
 			raise ReaderError("Failed to reset Calypso PHY")
 
@@ -129,21 +135,21 @@ class CalypsoSimLink(LinkBase):
 		self.sock.send(req_msg.gen_msg())
 
 		# Read message length first
-		rsp = self.wait_for_rsp(struct.calcsize("!H"))
-		msg_len = struct.unpack_from("!H", rsp)[0]
-		if msg_len < struct.calcsize("BBxx"):
+		rsp = self.wait_for_rsp(_l1ctl_len.size)
+		msg_len = _l1ctl_len.unpack_from(rsp)[0]
+		if msg_len < _l1ctl_hdr.size:
 			raise ReaderError("Missing L1CTL header for L1CTL_SIM_CONF")
 
 		# Read the whole message then
 		rsp = self.sock.recv(msg_len)
 
 		# Verify L1CTL header
-		hdr = struct.unpack_from("BBxx", rsp)
+		hdr = _l1ctl_hdr.unpack_from(rsp)
 		if hdr[0] != L1CTLMessageSIM.L1CTL_SIM_CONF:
 			raise ReaderError("Unexpected L1CTL message received")
 
 		# Verify the payload length
-		offset = struct.calcsize("BBxx")
+		offset = _l1ctl_hdr.size
 		if len(rsp) <= offset:
 			raise ProtocolError("Empty response from SIM?!?")
 
@@ -21,18 +21,19 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 #
 
+import re
 
 def h2b(s):
-	return ''.join([chr((int(x,16)<<4)+int(y,16)) for x,y in zip(s[0::2], s[1::2])])
+	return bytes.fromhex(s[:len(s) & ~1]).decode('latin-1')
 
 def b2h(s):
 	return ''.join(['%02x'%ord(x) for x in s])
 
 def h2i(s):
-	return [(int(x,16)<<4)+int(y,16) for x,y in zip(s[0::2], s[1::2])]
+	return list(bytes.fromhex(s[:len(s) & ~1]))
 
 def i2h(s):
-	return ''.join(['%02x'%(x) for x in s])
+	return bytes(s).hex()
 
 def h2s(s):
 	return ''.join([chr((int(x,16)<<4)+int(y,16)) for x,y in zip(s[0::2], s[1::2])
@@ -125,9 +126,8 @@ def enc_spn(name, hplmn_disp=False, oplmn_disp=False):
 def hexstr_to_Nbytearr(s, nbytes):
 	return [s[i:i+(nbytes*2)] for i in range(0, len(s), (nbytes*2)) ]
 
-# Accepts hex string representing three bytes
-def dec_mcc_from_plmn(plmn):
-	ia = h2i(plmn)
+# Accepts list of integers representing three bytes
+def _dec_mcc_from_plmn_bytes(ia):
 	digit1 = ia[0] & 0x0F		# 1st byte, LSB
 	digit2 = (ia[0] & 0xF0) >> 4	# 1st byte, MSB
 	digit3 = ia[1] & 0x0F		# 2nd byte, LSB
@@ -135,8 +135,7 @@ def dec_mcc_from_plmn(plmn):
 		return 0xFFF # 4095
 	return derive_mcc(digit1, digit2, digit3)
 
-def dec_mnc_from_plmn(plmn):
-	ia = h2i(plmn)
+def _dec_mnc_from_plmn_bytes(ia):
 	digit1 = ia[2] & 0x0F		# 3rd byte, LSB
 	digit2 = (ia[2] & 0xF0) >> 4	# 3rd byte, MSB
 	digit3 = (ia[1] & 0xF0) >> 4	# 2nd byte, MSB
@@ -144,33 +143,41 @@ def dec_mnc_from_plmn(plmn):
 		return 0xFFF # 4095
 	return derive_mnc(digit1, digit2, digit3)
 
+# Accepts hex string representing three bytes
+def dec_mcc_from_plmn(plmn):
+	return _dec_mcc_from_plmn_bytes(h2i(plmn))
+
+def dec_mnc_from_plmn(plmn):
+	return _dec_mnc_from_plmn_bytes(h2i(plmn))
+
+# Accepts hex string representing three bytes, returns (mcc, mnc) while
+# converting the hex string only once
+def _dec_mcc_mnc_from_plmn(plmn):
+	ia = h2i(plmn)
+	return (_dec_mcc_from_plmn_bytes(ia), _dec_mnc_from_plmn_bytes(ia))
+
+# Access Technology Identifier bits, see dec_act
+_act_list = (
+	(1 << 15, "UTRAN"),
+	(1 << 14, "E-UTRAN"),
+	(1 <<  7, "GSM"),
+	(1 <<  6, "GSM COMPACT"),
+	(1 <<  5, "cdma2000 HRPD"),
+	(1 <<  4, "cdma2000 1xRTT"),
+)
+
 def dec_act(twohexbytes):
-	act_list = [
-		{'bit': 15, 'name': "UTRAN"},
-		{'bit': 14, 'name': "E-UTRAN"},
-		{'bit':  7, 'name': "GSM"},
-		{'bit':  6, 'name': "GSM COMPACT"},
-		{'bit':  5, 'name': "cdma2000 HRPD"},
-		{'bit':  4, 'name': "cdma2000 1xRTT"},
-	]
 	ia = h2i(twohexbytes)
 	u16t = (ia[0] << 8)|ia[1]
-	sel = []
-	for a in act_list:
-		if u16t & (1 << a['bit']):
-			sel.append(a['name'])
-	return sel
+	return [name for (mask, name) in _act_list if u16t & mask]
 
 def dec_xplmn_w_act(fivehexbytes):
-	res = {'mcc': 0, 'mnc': 0, 'act': []}
 	plmn_chars = 6
 	act_chars = 4
 	plmn_str = fivehexbytes[:plmn_chars]				# first three bytes (six ascii hex chars)
 	act_str = fivehexbytes[plmn_chars:plmn_chars + act_chars]	# two bytes after first three bytes
-	res['mcc'] = dec_mcc_from_plmn(plmn_str)
-	res['mnc'] = dec_mnc_from_plmn(plmn_str)
-	res['act'] = dec_act(act_str)
-	return res
+	mcc, mnc = _dec_mcc_mnc_from_plmn(plmn_str)
+	return {'mcc': mcc, 'mnc': mnc, 'act': dec_act(act_str)}
 
 def format_xplmn_w_act(hexstr):
 	s = ""
@@ -186,8 +193,7 @@ def format_xplmn_w_act(hexstr):
 def dec_loci(hexstr):
 	res = {'tmsi': '',  'mcc': 0, 'mnc': 0, 'lac': '', 'status': 0}
 	res['tmsi'] = hexstr[:8]
-	res['mcc'] = dec_mcc_from_plmn(hexstr[8:14])
-	res['mnc'] = dec_mnc_from_plmn(hexstr[8:14])
+	res['mcc'], res['mnc'] = _dec_mcc_mnc_from_plmn(hexstr[8:14])
 	res['lac'] = hexstr[14:18]
 	res['status'] = h2i(hexstr[20:22])
 	return res
@@ -196,8 +202,7 @@ def dec_psloci(hexstr):
 	res = {'p-tmsi': '', 'p-tmsi-sig': '', 'mcc': 0, 'mnc': 0, 'lac': '', 'rac': '', 'status': 0}
 	res['p-tmsi'] = hexstr[:8]
 	res['p-tmsi-sig'] = hexstr[8:14]
-	res['mcc'] = dec_mcc_from_plmn(hexstr[14:20])
-	res['mnc'] = dec_mnc_from_plmn(hexstr[14:20])
+	res['mcc'], res['mnc'] = _dec_mcc_mnc_from_plmn(hexstr[14:20])
 	res['lac'] = hexstr[20:24]
 	res['rac'] = hexstr[24:26]
 	res['status'] = h2i(hexstr[26:28])
@@ -207,19 +212,16 @@ def dec_epsloci(hexstr):
 	res = {'guti': '', 'mcc': 0, 'mnc': 0, 'tac': '', 'status': 0}
 	res['guti'] = hexstr[:24]
 	res['tai'] = hexstr[24:34]
-	res['mcc'] = dec_mcc_from_plmn(hexstr[24:30])
-	res['mnc'] = dec_mnc_from_plmn(hexstr[24:30])
+	res['mcc'], res['mnc'] = _dec_mcc_mnc_from_plmn(hexstr[24:30])
 	res['tac'] = hexstr[30:34]
 	res['status'] = h2i(hexstr[34:36])
 	return res
 
 def dec_xplmn(threehexbytes):
-	res = {'mcc': 0, 'mnc': 0, 'act': []}
 	plmn_chars = 6
 	plmn_str = threehexbytes[:plmn_chars]				# first three bytes (six ascii hex chars)
-	res['mcc'] = dec_mcc_from_plmn(plmn_str)
-	res['mnc'] = dec_mnc_from_plmn(plmn_str)
-	return res
+	mcc, mnc = _dec_mcc_mnc_from_plmn(plmn_str)
+	return {'mcc': mcc, 'mnc': mnc, 'act': []}
 
 def format_xplmn(hexstr):
 	s = ""
@@ -238,7 +240,6 @@ def derive_milenage_opc(ki_hex, op_hex):
 	"""
 	from Crypto.Cipher import AES
 	from Crypto.Util.strxor import strxor
-	from pySim.utils import b2h
 
 	# We pass in hex string and now need to work on bytes
 	aes = AES.new(h2b(ki_hex))
@@ -257,7 +258,7 @@ def mcc_from_imsi(imsi):
 	"""
 	Derive the MCC (Mobile Country Code) from the first three digits of an IMSI
 	"""
-	if imsi == None:
+	if imsi is None:
 		return None
 
 	if len(imsi) > 3:
@@ -269,7 +270,7 @@ def mnc_from_imsi(imsi, long=False):
 	"""
 	Derive the MNC (Mobile Country Code) from the 4th to 6th digit of an IMSI
 	"""
-	if imsi == None:
+	if imsi is None:
 		return None
 
 	if len(imsi) > 3:
@@ -384,6 +385,10 @@ def enc_msisdn(msisdn, npi=0x01, ton=0x03):
 
 	return ('%02x' % bcd_len) + ('%02x' % npi_ton) + bcd
 
+# For each possible byte value of a service table, the offsets (1..8) of the
+# services it marks as available, LSB first (see dec_st)
+_st_byte_services = tuple(tuple(j for j in range(1, 9) if b & (1 << (j - 1))) for b in range(256))
+
 def dec_st(st, table="sim"):
 	"""
 	Parses the EF S/U/IST and prints the list of available services in EF S/U/IST
@@ -399,41 +404,38 @@ def dec_st(st, table="sim"):
 		from pySim.ts_51_011 import EF_SST_map
 		lookup_map = EF_SST_map
 
-	st_bytes = [st[i:i+2] for i in range(0, len(st), 2) ]
-
 	avail_st = ""
 	# Get each byte and check for available services
-	for i in range(0, len(st_bytes)):
+	for i, byte in enumerate(h2i(st)):
 		# Byte i contains info about Services num (8i+1) to num (8i+8)
-		byte = int(st_bytes[i], 16)
 		# Services in each byte are in order MSB to LSB
 		# MSB - Service (8i+8)
 		# LSB - Service (8i+1)
-		for j in range(1, 9):
-			if byte&0x01 == 0x01 and ((8*i) + j in lookup_map):
-				# Byte X contains info about Services num (8X-7) to num (8X)
-				# bit = 1: service available
-				# bit = 0: service not available
-				avail_st += '\tService %d - %s\n' % ((8*i) + j, lookup_map[(8*i) + j])
-			byte = byte >> 1
+		for j in _st_byte_services[byte]:
+			# Byte X contains info about Services num (8X-7) to num (8X)
+			# bit = 1: service available
+			# bit = 0: service not available
+			service = lookup_map.get((8*i) + j)
+			if service is not None:
+				avail_st += '\tService %d - %s\n' % ((8*i) + j, service)
 	return avail_st
 
-def first_TLV_parser(bytelist):
+def first_TLV_parser(bytelist, offset=0):
 	'''
 	first_TLV_parser([0xAA, 0x02, 0xAB, 0xCD, 0xFF, 0x00]) -> (170, 2, [171, 205])
 
-	parses first TLV format record in a list of bytelist
+	parses first TLV format record in a list of bytelist, starting at offset
 	returns a 3-Tuple: Tag, Length, Value
 	Value is a list of bytes
 	parsing of length is ETSI'style 101.220
 	'''
-	Tag = bytelist[0]
-	if bytelist[1] == 0xFF:
-		Len = bytelist[2]*256 + bytelist[3]
-		Val = bytelist[4:4+Len]
+	Tag = bytelist[offset]
+	if bytelist[offset+1] == 0xFF:
+		Len = bytelist[offset+2]*256 + bytelist[offset+3]
+		Val = bytelist[offset+4:offset+4+Len]
 	else:
-		Len = bytelist[1]
-		Val = bytelist[2:2+Len]
+		Len = bytelist[offset+1]
+		Val = bytelist[offset+2:offset+2+Len]
 	return (Tag, Len, Val)
 
 def TLV_parser(bytelist):
@@ -444,17 +446,19 @@ def TLV_parser(bytelist):
 	returns a list of 3-Tuples
 	'''
 	ret = []
-	while len(bytelist) > 0:
-		T, L, V = first_TLV_parser(bytelist)
+	# walk the list by offset rather than re-slicing the remainder
+	offset = 0
+	while offset < len(bytelist):
+		T, L, V = first_TLV_parser(bytelist, offset)
 		if T == 0xFF:
 			# padding bytes
 			break
 		ret.append( (T, L, V) )
 		# need to manage length of L
 		if L > 0xFE:
-			bytelist = bytelist[ L+4 : ]
+			offset += L+4
 		else:
-			bytelist = bytelist[ L+2 : ]
+			offset += L+2
 	return ret
 
 def enc_st(st, service, state=1):
@@ -472,33 +476,23 @@ def enc_st(st, service, state=1):
 	Default values:
 		- state: 1 - Sets the particular Service bit to 1
 	"""
-	st_bytes = [st[i:i+2] for i in range(0, len(st), 2) ]
-
-	s = ""
-	# Check whether the requested service is present in each byte
-	for i in range(0, len(st_bytes)):
-		# Byte i contains info about Services num (8i+1) to num (8i+8)
-		if service in range((8*i) + 1, (8*i) + 9):
-			byte = int(st_bytes[i], 16)
-			# Services in each byte are in order MSB to LSB
-			# MSB - Service (8i+8)
-			# LSB - Service (8i+1)
-			mod_byte = 0x00
-			# Copy bit by bit contents of byte to mod_byte with modified bit
-			# for requested service
-			for j in range(1, 9):
-				mod_byte = mod_byte >> 1
-				if service == (8*i) + j:
-					mod_byte = state == 1 and mod_byte|0x80 or mod_byte&0x7f
-				else:
-					mod_byte = byte&0x01 == 0x01 and mod_byte|0x80 or mod_byte&0x7f
-				byte = byte >> 1
-
-			s += ('%02x' % (mod_byte))
-		else:
-			s += st_bytes[i]
+	# Byte i contains info about Services num (8i+1) to num (8i+8),
+	# only that byte needs to be touched
+	i = (service - 1) // 8
+	if service < 1 or 2*i + 2 > len(st):
+		return st
+
+	# Services in each byte are in order MSB to LSB
+	# MSB - Service (8i+8)
+	# LSB - Service (8i+1)
+	byte = int(st[2*i:2*i + 2], 16)
+	mask = 1 << ((service - 1) % 8)
+	if state == 1:
+		byte = byte | mask
+	else:
+		byte = byte & ~mask
 
-	return s
+	return st[:2*i] + ('%02x' % byte) + st[2*i + 2:]
 
 def dec_addr_tlv(hexstr):
 	"""
@@ -603,6 +597,35 @@ def sanitize_pin_adm(opts):
 
 	return pin_adm
 
+def add_reader_options(parser):
+	"""
+	Add the card reader driver options consumed by init_reader to an OptionParser
+	"""
+	parser.add_option("-d", "--device", dest="device", metavar="DEV",
+			help="Serial Device for SIM access [default: %default]",
+			default="/dev/ttyUSB0",
+		)
+	parser.add_option("-b", "--baud", dest="baudrate", type="int", metavar="BAUD",
+			help="Baudrate used for SIM access [default: %default]",
+			default=9600,
+		)
+	parser.add_option("-p", "--pcsc-device", dest="pcsc_dev", type='int', metavar="PCSC",
+			help="Which PC/SC reader number for SIM access",
+			default=None,
+		)
+	parser.add_option("--modem-device", dest="modem_dev", metavar="DEV",
+			help="Serial port of modem for Generic SIM Access (3GPP TS 27.007)",
+			default=None,
+		)
+	parser.add_option("--modem-baud", dest="modem_baud", type="int", metavar="BAUD",
+			help="Baudrate used for modem's port [default: %default]",
+			default=115200,
+		)
+	parser.add_option("--osmocon", dest="osmocon_sock", metavar="PATH",
+			help="Socket path for Calypso (e.g. Motorola C1XX) based reader (via OsmocomBB)",
+			default=None,
+		)
+
 def init_reader(opts):
 	"""
 	Init card reader driver
@@ -658,8 +681,7 @@ def dec_ePDGSelection(sixhexbytes):
 	epdg_priority_str = sixhexbytes[plmn_chars:plmn_chars + epdg_priority_chars]
 	# one byte after first five bytes
 	epdg_fqdn_format_str = sixhexbytes[plmn_chars + epdg_priority_chars:plmn_chars + epdg_priority_chars + epdg_fqdn_format_chars]
-	res['mcc'] = dec_mcc_from_plmn(plmn_str)
-	res['mnc'] = dec_mnc_from_plmn(plmn_str)
+	res['mcc'], res['mnc'] = _dec_mcc_mnc_from_plmn(plmn_str)
 	res['epdg_priority'] = epdg_priority_str
 	res['epdg_fqdn_format'] = epdg_fqdn_format_str == '00' and 'Operator Identifier FQDN' or 'Location based FQDN'
 	return res
@@ -701,6 +723,11 @@ def format_ePDGSelection(hexstr):
 		s += "\t%s # %s\n" % (rec_data, rec_str)
 	return s
 
+# Patterns for the labels of a dotted address, see get_addr_type
+_ipv4_label_re = re.compile('^[0-9_]+$')
+# Only Alpha-numeric characters and hyphen - RFC 1035
+_fqdn_label_re = re.compile("^[a-zA-Z0-9]+(?:-[a-zA-Z0-9]+)?$")
+
 def get_addr_type(addr):
 	"""
 	Validates the given address and returns it's type (FQDN or IPv4 or IPv6)
@@ -737,8 +764,7 @@ def get_addr_type(addr):
 		for i in addr_list:
 			# Invalid IPv4 may qualify for a valid FQDN, so make check here
 			# e.g. 172.24.15.300
-			import re
-			if not re.match('^[0-9_]+$', i):
+			if not _ipv4_label_re.match(i):
 				invalid_ipv4 = False
 				break
 
@@ -747,9 +773,7 @@ def get_addr_type(addr):
 
 	fqdn_flag = True
 	for i in addr_list:
-		# Only Alpha-numeric characters and hyphen - RFC 1035
-		import re
-		if not re.match("^[a-zA-Z0-9]+(?:-[a-zA-Z0-9]+)?$", i):
+		if not _fqdn_label_re.match(i):
 			fqdn_flag = False
 			break
 
@@ -72,5 +72,14 @@ ffffff0000 # unused
 '''
 		self.assertEqual(utils.format_xplmn_w_act(input_str), expected)
 
+	def testTLVParser(self):
+		input_list = [0x80, 0x02, 0xab, 0xcd, 0x81, 0x00, 0x82, 0x01, 0x01, 0xff, 0xff, 0xff, 0xff]
+		expected = [
+			(0x80, 2, [0xab, 0xcd]),
+			(0x81, 0, []),
+			(0x82, 1, [0x01]),
+		]
+		self.assertEqual(utils.TLV_parser(input_list), expected)
+
 if __name__ == "__main__":
 	unittest.main()